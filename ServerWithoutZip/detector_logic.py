@@ -4,16 +4,32 @@ NOTE: This file has been cosmetically refactored for readability only.
 No functional behavior, logic, or outputs are intended to change.
 """
 
-import boto3
+import heapq
 import json
 import os
-import re
-import math
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
+import numpy as np
 from botocore.exceptions import ClientError
 
+from lifeshot_common import (
+    BOTO_CFG as _BOTO_CFG,
+    SESSION as _SESSION,
+    basename as _basename,
+    is_image_key as _is_image_key,
+    resp as _resp,
+    s3,
+)
+
+# Optional: globally optimal box assignment. The scipy layer may not be
+# attached to this function; the matcher falls back to greedy matching.
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
 # =============================================================================
 # Environment configuration
 # =============================================================================
@@ -23,6 +39,9 @@ FRAMES_BUCKET_PREFIX = os.getenv("FRAMES_BUCKET_PREFIX", "").strip()
 FRAMES_PREFIX = os.getenv("FRAMES_PREFIX", "LifeShot/")  # input frames
 DROWNINGSET_PREFIX = os.getenv("DROWNINGSET_PREFIX", "LifeShot/DrowningSet/")
 
+# Per-frame detection results written by detect_handler (Step Functions Map).
+INTERMEDIATES_PREFIX = os.getenv("INTERMEDIATES_PREFIX", "LifeShot/Intermediates/")
+
 MAX_FRAMES = int(os.getenv("MAX_FRAMES", "200"))
 MIN_CONFIDENCE = float(os.getenv("MIN_CONFIDENCE", "70"))
 
@@ -31,19 +50,68 @@ MAX_BOX_AREA = float(os.getenv("MAX_BOX_AREA", "0.70"))
 
 MATCH_IOU_MIN = float(os.getenv("MATCH_IOU_MIN", "0.08"))
 MATCH_CENTER_MAX = float(os.getenv("MATCH_CENTER_MAX", "0.12"))
+_MATCH_CENTER_MAX_SQ = MATCH_CENTER_MAX * MATCH_CENTER_MAX
+
+# Weight of center proximity vs IoU in the Hungarian assignment cost.
+MATCH_DIST_ALPHA = float(os.getenv("MATCH_DIST_ALPHA", "0.5"))
 
 PRESIGN_EXPIRES = int(os.getenv("PRESIGN_EXPIRES", "3600"))
 
 # Events lambda already has its own EVENTS_TABLE_NAME + SNS_TOPIC_ARN in env vars.
 EVENTS_TABLE_NAME = os.getenv("EVENTS_TABLE_NAME", "LifeShot_Events")
 
+# ETag-keyed Rekognition result cache (DDB table with TTL enabled).
+# Re-runs over the same frames skip the paid detect_labels call entirely.
+DETECTION_CACHE_TABLE = os.getenv("DETECTION_CACHE_TABLE", "LifeShot_DetectionCache")
+DETECTION_CACHE_TTL = int(os.getenv("DETECTION_CACHE_TTL", str(86400 * 7)))
+
 # Names of the other two Lambdas.
 RENDER_LAMBDA_NAME = os.getenv("RENDER_LAMBDA_NAME", "LifeShot_RenderAndS3")
 EVENTS_LAMBDA_NAME = os.getenv("EVENTS_LAMBDA_NAME", "LifeShot_EventsAndSNS")
 
-rekognition = boto3.client("rekognition")
-s3 = boto3.client("s3")
-lambda_client = boto3.client("lambda")
+# Rendered-output extension must track the render lambda's OUT_FORMAT so
+# presigned keys point at what it actually uploads.
+OUT_FORMAT = os.getenv("OUT_FORMAT", "jpeg").strip().lower()
+_OUT_EXT = "png" if OUT_FORMAT == "png" else "jpg"
+
+# When "0" (default), OK-frame outputs carry plain s3:// URIs instead of
+# presigned URLs: the response already includes the key, nobody clicks the
+# bulk URLs, and each presign is an HMAC-SHA256 signing pass. Alert URLs
+# are always presigned (they go into SNS emails and event records).
+PRESIGN_OUTPUTS = os.getenv("PRESIGN_OUTPUTS", "0") == "1"
+
+# When "0" (default), frames with nothing to draw (no people, no alert) are
+# passthrough-copied to the drowningset instead of being rendered with a
+# title bar. Set to "1" to force a render of every frame.
+DRAW_TITLE_ON_OK = os.getenv("DRAW_TITLE_ON_OK", "0") == "1"
+
+# Detection prefetch: worker threads issuing Rekognition calls ahead of the
+# sequential reduction (each call is an HTTPS round-trip, so this is pure
+# I/O overlap).
+DETECT_WORKERS = int(os.getenv("DETECT_WORKERS", "16"))
+
+# Module-level pool: warm containers reuse the threads (and their pooled
+# HTTPS connections) across invocations instead of respawning per run.
+_DETECT_POOL = ThreadPoolExecutor(max_workers=DETECT_WORKERS)
+
+# How long the alert path waits for its async render to land in S3 before
+# the event record is created (seconds between polls x attempts).
+RENDER_WAIT_DELAY = int(os.getenv("RENDER_WAIT_DELAY", "1"))
+RENDER_WAIT_ATTEMPTS = int(os.getenv("RENDER_WAIT_ATTEMPTS", "10"))
+
+rekognition = _SESSION.client("rekognition", config=_BOTO_CFG)
+lambda_client = _SESSION.client("lambda", config=_BOTO_CFG)
+# Low-level client (NOT the resource layer) for the detection cache: the
+# cache is hit from _DETECT_POOL worker threads, and boto3 documents only
+# clients as thread-safe. Typed attributes are a small price for that.
+ddb_client = _SESSION.client("dynamodb", config=_BOTO_CFG)
+
+# Pre-bound client methods for the per-frame hot paths: botocore resolves
+# client methods through __getattr__, so binding once at module load skips
+# that lookup on every call.
+_detect_labels = rekognition.detect_labels
+_copy_object = s3.copy_object
+_generate_presigned_url = s3.generate_presigned_url
 
 
 # =============================================================================
@@ -51,77 +119,12 @@ lambda_client = boto3.client("lambda")
 # =============================================================================
 
 
-# Build an API Gateway / Function URL style JSON response.
-def _resp(code, body_obj):
-    return {
-        "statusCode": code,
-        "headers": {"Content-Type": "application/json"},
-        "body": json.dumps(body_obj),
-    }
-
-
-
-# Return True if the S3 key looks like a supported image file.
-def _is_image_key(key: str) -> bool:
-    k = key.lower()
-    return k.endswith(".png") or k.endswith(".jpg") or k.endswith(".jpeg")
-
-
-
-# Return the filename (no folders) without image extension.
-def _basename(key: str) -> str:
-    name = key.split("/")[-1]
-    name = re.sub(r"\.(png|jpg|jpeg)$", "", name, flags=re.IGNORECASE)
-    return name
-
-
-
-# Compute the center point (x, y) of a Rekognition-style bounding box.
-def _center(b):
-    return (
-        float(b.get("Left", 0)) + float(b.get("Width", 0)) / 2.0,
-        float(b.get("Top", 0)) + float(b.get("Height", 0)) / 2.0,
-    )
-
-
-
-# Euclidean distance between two points.
-def _dist(a, b):
-    return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2)
-
-
-
-# Intersection-over-Union for two Rekognition-style bounding boxes.
-def _iou(a, b):
-    ax1, ay1 = float(a["Left"]), float(a["Top"])
-    ax2, ay2 = ax1 + float(a["Width"]), ay1 + float(a["Height"])
-    bx1, by1 = float(b["Left"]), float(b["Top"])
-    bx2, by2 = bx1 + float(b["Width"]), by1 + float(b["Height"])
-
-    ix1 = max(ax1, bx1)
-    iy1 = max(ay1, by1)
-    ix2 = min(ax2, bx2)
-    iy2 = min(ay2, by2)
-
-    iw = max(0.0, ix2 - ix1)
-    ih = max(0.0, iy2 - iy1)
-    inter = iw * ih
-    if inter <= 0:
-        return 0.0
-
-    a_area = (ax2 - ax1) * (ay2 - ay1)
-    b_area = (bx2 - bx1) * (by2 - by1)
-    union = max(1e-9, a_area + b_area - inter)
-    return inter / union
-
-
-
 # Create a pre-signed S3 GET URL for an object key (or None on failure).
 def presign_get_url(bucket, key):
     if not key:
         return None
     try:
-        return s3.generate_presigned_url(
+        return _generate_presigned_url(
             "get_object",
             Params={"Bucket": bucket, "Key": key},
             ExpiresIn=PRESIGN_EXPIRES,
@@ -200,46 +203,205 @@ def _pick_bucket_by_prefix(bucket_prefix: str, data_prefix: str) -> str:
 # =============================================================================
 
 
-# Run Rekognition label detection and extract bounding boxes for "Person" instances.
+# Run Rekognition label detection and extract bounding boxes for "Person"
+# instances, as an ((N, 4) float32 xyxy array, (N,) confidence array) pair.
 def detect_person_boxes(bucket, key):
     try:
-        res = rekognition.detect_labels(
+        # Server-side inclusion filter: Rekognition returns only the Person
+        # label, so the response carries no unrelated label blobs at all —
+        # less wire payload and less botocore JSON decoding.
+        res = _detect_labels(
             Image={"S3Object": {"Bucket": bucket, "Name": key}},
-            MaxLabels=25,
+            MaxLabels=5,
             MinConfidence=MIN_CONFIDENCE,
+            Features=["GENERAL_LABELS"],
+            Settings={"GeneralLabels": {"LabelInclusionFilters": ["Person"]}},
         )
 
-        boxes = []
-        for label in res.get("Labels", []):
-            if label.get("Name") != "Person":
+        rows = []
+        confs = []
+        person = next(
+            (l for l in res.get("Labels", []) if l.get("Name") == "Person"), None
+        )
+        for inst in (person.get("Instances", []) if person else []):
+            box = inst.get("BoundingBox", {})
+            w = float(box.get("Width", 0))
+            h = float(box.get("Height", 0))
+            area = w * h
+
+            if area < MIN_BOX_AREA:
+                continue
+            if area > MAX_BOX_AREA:
                 continue
 
-            for inst in label.get("Instances", []):
-                box = inst.get("BoundingBox", {})
-                w = float(box.get("Width", 0))
-                h = float(box.get("Height", 0))
-                area = w * h
+            left = float(box.get("Left", 0))
+            top = float(box.get("Top", 0))
+            rows.append((left, top, left + w, top + h))
+            confs.append(float(inst.get("Confidence", 0)))
 
-                if area < MIN_BOX_AREA:
-                    continue
-                if area > MAX_BOX_AREA:
-                    continue
+        return (
+            np.asarray(rows, dtype=np.float32).reshape(-1, 4),
+            np.asarray(confs, dtype=np.float32),
+        )
+
+    except Exception as e:
+        print(f"[ERROR] detect_person_boxes failed for {key}: {str(e)}")
+        return _EMPTY_XYXY, np.empty(0, dtype=np.float32)
+
+
+# In-process tier in front of the DDB cache: a warm container re-scanning
+# an overlapping frame window skips even the cache table's GetItem.
+# Frames are immutable per ETag, so entries never go stale; the cap just
+# bounds memory.
+_WARM_DETECTIONS = {}  # etag -> (xyxy, confs)
+_WARM_DETECTIONS_MAX = int(os.getenv("WARM_DETECTIONS_MAX", "512"))
 
-                boxes.append(
-                    {
-                        "Left": float(box.get("Left", 0)),
-                        "Top": float(box.get("Top", 0)),
-                        "Width": w,
-                        "Height": h,
-                        "Conf": float(inst.get("Confidence", 0)),
-                    }
-                )
 
-        return boxes
+# ETag-cached wrapper around detect_person_boxes. The listing already hands
+# us each object's ETag for free, so cache lookups need no extra S3 call.
+# Cache failures only log: detection always falls through to Rekognition.
+def detect_person_boxes_cached(bucket, key, etag):
+    if not etag:
+        return detect_person_boxes(bucket, key)
 
+    warm = _WARM_DETECTIONS.get(etag)
+    if warm is not None:
+        return warm
+
+    try:
+        got = ddb_client.get_item(
+            TableName=DETECTION_CACHE_TABLE, Key={"etag": {"S": etag}}
+        )
+        item = got.get("Item")
+        if item:
+            box_dicts = json.loads(item["boxes"]["S"])
+            result = (
+                _boxes_to_xyxy(box_dicts),
+                np.asarray([b.get("Conf", 0) for b in box_dicts], dtype=np.float32),
+            )
+            _remember_detection(etag, result)
+            return result
     except Exception as e:
-        print(f"[ERROR] detect_person_boxes failed for {key}: {str(e)}")
-        return []
+        print(f"[WARN] detection cache read failed for {key}: {str(e)}")
+
+    xyxy, confs = detect_person_boxes(bucket, key)
+    _remember_detection(etag, (xyxy, confs))
+
+    try:
+        ddb_client.put_item(
+            TableName=DETECTION_CACHE_TABLE,
+            Item={
+                "etag": {"S": etag},
+                "boxes": {"S": json.dumps(_xyxy_to_box_dicts(xyxy, confs))},
+                "ttl": {"N": str(int(time.time()) + DETECTION_CACHE_TTL)},
+            },
+        )
+    except Exception as e:
+        print(f"[WARN] detection cache write failed for {key}: {str(e)}")
+
+    return xyxy, confs
+
+
+# Keep the warm cache bounded: drop everything rather than track LRU order
+# once the cap is hit (overlapping windows refill it in one pass anyway).
+def _remember_detection(etag, result):
+    if len(_WARM_DETECTIONS) >= _WARM_DETECTIONS_MAX:
+        _WARM_DETECTIONS.clear()
+    _WARM_DETECTIONS[etag] = result
+
+
+# =============================================================================
+# Pairwise matching kernel (vectorized)
+# =============================================================================
+
+# Reusable scratch buffers for the pairwise kernel. Frames rarely hold more
+# than a handful of people, so a fixed 16x16 tile covers the common case and
+# every frame reuses the same memory instead of churning the allocator.
+# NOTE: the kernel is only called from the sequential reduction loop, so the
+# shared buffers need no locking.
+_SCRATCH_DIM = 16
+_SCRATCH_TL = np.empty((_SCRATCH_DIM, _SCRATCH_DIM, 2), dtype=np.float32)
+_SCRATCH_BR = np.empty_like(_SCRATCH_TL)
+_SCRATCH_INTER = np.empty((_SCRATCH_DIM, _SCRATCH_DIM), dtype=np.float32)
+_SCRATCH_IOU = np.empty_like(_SCRATCH_INTER)
+_SCRATCH_D2 = np.empty_like(_SCRATCH_INTER)
+
+# Shared "no boxes" value for the SoA pipeline (safe to share: zero rows).
+_EMPTY_XYXY = np.empty((0, 4), dtype=np.float32)
+
+
+
+# Stack Rekognition-style box dicts into an (N, 4) float32 [x1, y1, x2, y2] array.
+def _boxes_to_xyxy(boxes):
+    arr = np.empty((len(boxes), 4), dtype=np.float32)
+    for i, b in enumerate(boxes):
+        left = float(b.get("Left", 0))
+        top = float(b.get("Top", 0))
+        arr[i, 0] = left
+        arr[i, 1] = top
+        arr[i, 2] = left + float(b.get("Width", 0))
+        arr[i, 3] = top + float(b.get("Height", 0))
+    return arr
+
+
+
+# Convert an (N, 4) xyxy array back to Rekognition-style dicts. Only used at
+# JSON boundaries (Lambda payloads, API responses, intermediates) — inside
+# the pipeline boxes stay as arrays.
+def _xyxy_to_box_dicts(xyxy, confs=None):
+    out = []
+    for i in range(len(xyxy)):
+        x1, y1, x2, y2 = (float(v) for v in xyxy[i])
+        b = {"Left": x1, "Top": y1, "Width": x2 - x1, "Height": y2 - y1}
+        if confs is not None:
+            b["Conf"] = float(confs[i])
+        out.append(b)
+    return out
+
+
+
+# Pairwise IoU and squared center distance for xyxy arrays a (N,4) and b (M,4).
+# Returns (iou, d2), both of shape (N, M). Shapes within the scratch tile
+# reuse the module-level buffers via out= so steady state allocates nothing.
+def _pairwise_iou_d2(a, b):
+    n, m = len(a), len(b)
+    if n <= _SCRATCH_DIM and m <= _SCRATCH_DIM:
+        tl = _SCRATCH_TL[:n, :m]
+        br = _SCRATCH_BR[:n, :m]
+        inter = _SCRATCH_INTER[:n, :m]
+        iou = _SCRATCH_IOU[:n, :m]
+        d2 = _SCRATCH_D2[:n, :m]
+    else:
+        tl = np.empty((n, m, 2), dtype=np.float32)
+        br = np.empty_like(tl)
+        inter = np.empty((n, m), dtype=np.float32)
+        iou = np.empty_like(inter)
+        d2 = np.empty_like(inter)
+
+    # Intersection rectangle -> overlap area.
+    np.maximum(a[:, None, :2], b[None, :, :2], out=tl)
+    np.minimum(a[:, None, 2:], b[None, :, 2:], out=br)
+    np.subtract(br, tl, out=br)  # br now holds overlap width/height
+    np.clip(br, 0.0, None, out=br)
+    np.multiply(br[..., 0], br[..., 1], out=inter)
+
+    # IoU = inter / (area_a + area_b - inter), union guarded against zero.
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    np.add(area_a[:, None], area_b[None, :], out=iou)
+    np.subtract(iou, inter, out=iou)
+    np.maximum(iou, 1e-9, out=iou)
+    np.divide(inter, iou, out=iou)
+
+    # Squared center distances (reusing the tl buffer for the diffs).
+    # einsum fuses the square-and-sum over the xy axis into one pass
+    # instead of a multiply pass plus an add pass.
+    ca = (a[:, :2] + a[:, 2:]) * 0.5
+    cb = (b[:, :2] + b[:, 2:]) * 0.5
+    np.subtract(ca[:, None, :], cb[None, :, :], out=tl)
+    np.einsum("nmk,nmk->nm", tl, tl, out=d2)
+
+    return iou, d2
 
 
 # =============================================================================
@@ -247,63 +409,87 @@ def detect_person_boxes(bucket, key):
 # =============================================================================
 
 
-# Identify boxes from prev_boxes that do not match any current box.
-def find_missing_boxes(prev_boxes, curr_boxes):
-    if not prev_boxes:
-        return []
-    if not curr_boxes:
-        return prev_boxes[:]
+# Identify rows of prev_xyxy that do not match any current box.
+def find_missing_boxes(prev_xyxy, curr_xyxy):
+    if prev_xyxy is None or len(prev_xyxy) == 0:
+        return _EMPTY_XYXY
+    if len(curr_xyxy) == 0:
+        return prev_xyxy.copy()
+
+    iou, d2 = _pairwise_iou_d2(prev_xyxy, curr_xyxy)
+
+    if linear_sum_assignment is not None:
+        # Hungarian assignment on the joint affinity: each curr box can be
+        # claimed by at most one prev box, so two prev boxes can no longer
+        # both "match" the same survivor and hide a real disappearance.
+        # Center proximity is normalized by MATCH_CENTER_MAX so the two
+        # terms share a 0..1 scale; raw distances would otherwise drown
+        # out the IoU term for far-apart pairs.
+        # Prev rows left unassigned (N > M) are missing by construction.
+        proximity = 1.0 - np.clip(np.sqrt(d2) / MATCH_CENTER_MAX, 0.0, 1.0)
+        rows, cols = linear_sum_assignment(-(iou + MATCH_DIST_ALPHA * proximity))
+        matched = np.zeros(len(prev_xyxy), dtype=bool)
+        ok = (iou[rows, cols] >= MATCH_IOU_MIN) | (d2[rows, cols] <= _MATCH_CENTER_MAX_SQ)
+        matched[rows[ok]] = True
+    else:
+        # Greedy fallback: a prev box is matched if ANY curr box is close.
+        matched = (iou.max(axis=1) >= MATCH_IOU_MIN) | (
+            d2.min(axis=1) <= _MATCH_CENTER_MAX_SQ
+        )
 
-    missing = []
-    for pb in prev_boxes:
-        best_iou = 0.0
-        best_dist = 999.0
-        pc = _center(pb)
+    return prev_xyxy[~matched]
 
-        for cb in curr_boxes:
-            iou = _iou(pb, cb)
-            dist = _dist(pc, _center(cb))
-            if iou > best_iou:
-                best_iou = iou
-            if dist < best_dist:
-                best_dist = dist
 
-        matched = (best_iou >= MATCH_IOU_MIN) or (best_dist <= MATCH_CENTER_MAX)
-        if not matched:
-            missing.append(pb)
 
-    return missing
+# Return the single prev box (as a (1, 4) array) that disappeared. Fast
+# path for the common drop_by == 1 case: the candidate set comes from the
+# matcher (Hungarian when scipy is present), and only when several prev
+# boxes went unmatched does a score argmax break the tie. Scoring all
+# prev rows directly would let a weakly-but-genuinely matched box outscore
+# the real disappearance.
+def _worst_matched_prev(prev_xyxy, curr_xyxy):
+    if prev_xyxy is None or len(prev_xyxy) == 0:
+        return _EMPTY_XYXY
+    if len(curr_xyxy) == 0:
+        # No current boxes: every prev box scores the same, take the first.
+        return prev_xyxy[:1].copy()
 
+    missing = find_missing_boxes(prev_xyxy, curr_xyxy)
+    if len(missing) == 0:
+        # Matcher found no clear disappearance (the drop came from a missed
+        # detection): fall back to scoring every prev box.
+        missing = prev_xyxy
+    if len(missing) == 1:
+        return missing[:1].copy()
 
+    iou, d2 = _pairwise_iou_d2(missing, curr_xyxy)
+    scores = (1.0 - iou.max(axis=1)) + np.sqrt(d2.min(axis=1))
+    return missing[[int(np.argmax(scores))]]
 
-# Choose up to drop_by missing boxes with the strongest "missing" score.
-def pick_top_missing(prev_boxes, curr_boxes, missing_candidates, drop_by):
-    if drop_by <= 0:
-        return []
-    if not missing_candidates:
-        return []
-    if len(missing_candidates) <= drop_by:
-        return missing_candidates
 
-    scored = []
-    for pb in missing_candidates:
-        best_iou = 0.0
-        best_dist = 999.0
-        pc = _center(pb)
 
-        for cb in (curr_boxes or []):
-            iou = _iou(pb, cb)
-            dist = _dist(pc, _center(cb))
-            if iou > best_iou:
-                best_iou = iou
-            if dist < best_dist:
-                best_dist = dist
+# Choose up to drop_by rows of missing_xyxy with the strongest "missing" score.
+def pick_top_missing(curr_xyxy, missing_xyxy, drop_by):
+    if drop_by <= 0:
+        return _EMPTY_XYXY
+    if len(missing_xyxy) == 0:
+        return _EMPTY_XYXY
+    if len(missing_xyxy) <= drop_by:
+        return missing_xyxy
+
+    # No current boxes ("everyone disappeared"): every candidate would get
+    # the same constant score, so skip scoring and take the first drop_by.
+    if len(curr_xyxy) == 0:
+        return missing_xyxy[:drop_by]
 
-        score = (1.0 - best_iou) + best_dist
-        scored.append((score, pb))
+    iou, d2 = _pairwise_iou_d2(missing_xyxy, curr_xyxy)
+    scores = (1.0 - iou.max(axis=1)) + np.sqrt(d2.min(axis=1))
 
-    scored.sort(reverse=True, key=lambda x: x[0])
-    return [pb for _, pb in scored[:drop_by]]
+    # Partial selection: argpartition pulls the top drop_by in O(N), then a
+    # tiny sort keeps the strongest-first output order.
+    idx = np.argpartition(-scores, drop_by - 1)[:drop_by]
+    idx = idx[np.argsort(-scores[idx])]
+    return missing_xyxy[idx]
 
 
 # =============================================================================
@@ -311,27 +497,81 @@ def pick_top_missing(prev_boxes, curr_boxes, missing_candidates, drop_by):
 # =============================================================================
 
 
-# List image keys under a prefix in LastModified order (oldest -> newest).
+# Warm-container listing cache: back-to-back invocations over the same
+# prefix (common while debugging, and for the reduce path right after the
+# Map fan-out) skip the paginated re-list for a couple of seconds.
+LIST_CACHE_TTL = float(os.getenv("LIST_CACHE_TTL", "2.0"))
+_LIST_CACHE = {}  # (bucket, prefix, max_frames) -> (monotonic ts, pairs)
+
+# The bootstrap uploader writes zero-padded keys (00001.png, ...), so S3's
+# lexicographic listing order IS frame order and pagination can stop as
+# soon as max_frames image keys are in hand — no need to page the whole
+# bucket and sort by LastModified. Set to "0" for buckets with unpadded
+# or externally produced keys.
+FRAMES_KEYS_SORTED = os.getenv("FRAMES_KEYS_SORTED", "1") == "1"
+
+
+# True for keys a previous run wrote (basename suffixed _OK/_ALERT). The
+# admin flow points the detector at the drowningset prefix, which is also
+# where outputs land — so a re-run would otherwise pick up the last run's
+# annotated frames as sources (00001_OK.jpg sorts right after 00001.png),
+# interleaving garbage into the frame sequence and compounding every run.
+def _is_output_key(key: str) -> bool:
+    return _basename(key).endswith(("_OK", "_ALERT"))
+
+
+# List (key, etag) pairs of images under a prefix in LastModified order
+# (oldest -> newest). ETags come for free from the listing and key the
+# detection cache.
 def list_frames_numeric(bucket, prefix, max_frames):
+    cache_key = (bucket, prefix, max_frames)
+    cached = _LIST_CACHE.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < LIST_CACHE_TTL:
+        return cached[1]
+
     paginator = s3.get_paginator("list_objects_v2")
-    pages = paginator.paginate(Bucket=bucket, Prefix=prefix)
+    # Full 1000-key pages: fewest round trips per listing.
+    pages = paginator.paginate(
+        Bucket=bucket, Prefix=prefix, PaginationConfig={"PageSize": 1000}
+    )
+
+    if FRAMES_KEYS_SORTED and max_frames:
+        # Zero-padded keys: take the first max_frames image keys in listing
+        # order and stop paginating — one round trip for typical windows.
+        pairs = []
+        for page in pages:
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                if key.endswith("/") or (not _is_image_key(key)) or _is_output_key(key):
+                    continue
+                pairs.append((key, (obj.get("ETag") or "").strip('"')))
+            if len(pairs) >= max_frames:
+                break
+        pairs = pairs[:max_frames]
+        _LIST_CACHE[cache_key] = (time.monotonic(), pairs)
+        return pairs
 
     frames = []
     for page in pages:
         for obj in page.get("Contents", []):
             key = obj["Key"]
-            if key.endswith("/") or (not _is_image_key(key)):
+            if key.endswith("/") or (not _is_image_key(key)) or _is_output_key(key):
                 continue
             lm = obj.get("LastModified")
             if lm is None:
                 lm = datetime.min.replace(tzinfo=timezone.utc)
-            frames.append((lm, key))
+            frames.append((lm, key, (obj.get("ETag") or "").strip('"')))
 
-    frames.sort(key=lambda x: x[0])  # oldest -> newest
-    keys = [k for _, k in frames]
-    if max_frames and len(keys) > max_frames:
-        keys = keys[:max_frames]
-    return keys
+    # Only the oldest max_frames entries are needed: a partial selection is
+    # O(N log k) vs the full sort's O(N log N) on large buckets.
+    if max_frames and len(frames) > max_frames:
+        frames = heapq.nsmallest(max_frames, frames, key=lambda x: x[0])
+    else:
+        frames.sort(key=lambda x: x[0])  # oldest -> newest
+    pairs = [(k, e) for _, k, e in frames]
+
+    _LIST_CACHE[cache_key] = (time.monotonic(), pairs)
+    return pairs
 
 
 # =============================================================================
@@ -373,18 +613,50 @@ def _normalize_event(event):
 # =============================================================================
 
 
-# Invoke the Render lambda synchronously (RequestResponse) and parse its JSON response.
+# Invoke the Render lambda asynchronously (Event). The output key is
+# deterministic, so callers presign it locally instead of waiting for the
+# render response just to learn the URL.
 def invoke_render_lambda(payload: dict) -> dict:
     resp = lambda_client.invoke(
         FunctionName=RENDER_LAMBDA_NAME,
-        InvocationType="RequestResponse",
+        InvocationType="Event",  # async
         Payload=json.dumps(payload).encode("utf-8"),
     )
-    raw = resp["Payload"].read().decode("utf-8") or "{}"
+    return {"invoked": True, "status_code": resp.get("StatusCode")}
+
+
+
+# Synchronous render invoke: last-resort path for alerts whose async
+# render did not land within the wait window (cold start + async queueing
+# can exceed it). Slower, but an alert must never be dropped over it.
+def invoke_render_lambda_sync(payload: dict) -> dict:
     try:
-        return json.loads(raw)
-    except Exception:
-        return {"ok": False, "error": "render_lambda_invalid_json", "raw": raw}
+        resp = lambda_client.invoke(
+            FunctionName=RENDER_LAMBDA_NAME,
+            InvocationType="RequestResponse",
+            Payload=json.dumps(payload).encode("utf-8"),
+        )
+        return json.loads(resp["Payload"].read())
+    except Exception as e:
+        print(f"[ERROR] synchronous render fallback failed: {str(e)}")
+        return {"ok": False, "error": str(e)}
+
+
+
+# Block until a rendered object exists in S3 (alert path only: the Events
+# lambda must not reference an image that has not been uploaded yet).
+def _wait_for_object(bucket, key) -> bool:
+    try:
+        waiter = s3.get_waiter("object_exists")
+        waiter.wait(
+            Bucket=bucket,
+            Key=key,
+            WaiterConfig={"Delay": RENDER_WAIT_DELAY, "MaxAttempts": RENDER_WAIT_ATTEMPTS},
+        )
+        return True
+    except Exception as e:
+        print(f"[ERROR] rendered object never appeared: {key}: {str(e)}")
+        return False
 
 
 
@@ -403,15 +675,8 @@ def invoke_events_lambda(payload: dict) -> dict:
 # =============================================================================
 
 
-# Orchestrate frame processing:
-# - list frames
-# - detect people per frame
-# - track counter drops + missing boxes
-# - render annotated output frames
-# - create events (DDB + SNS) via Events lambda
-def lambda_handler(event, context):
-    event = _normalize_event(event)
-
+# Resolve (bucket, prefixes, max_frames) from a normalized event.
+def _resolve_inputs(event):
     prefix = FRAMES_PREFIX
     drowningset_prefix = DROWNINGSET_PREFIX
     max_frames = MAX_FRAMES
@@ -455,33 +720,47 @@ def lambda_handler(event, context):
         else:
             BUCKET = FRAMES_BUCKET_ENV
 
-    frame_keys = list_frames_numeric(BUCKET, prefix, max_frames)
-    if not frame_keys:
-        return _resp(
-            200,
-            {
-                "status": "NO_FRAMES",
-                "bucket": BUCKET,
-                "prefix": prefix,
-                "hint": "Check FRAMES_BUCKET/FRAMES_BUCKET_PREFIX or upload images under this prefix.",
-            },
-        )
+    return BUCKET, prefix, drowningset_prefix, max_frames
+
+
+
+# "No frames found" response body (shared by the handlers).
+def _no_frames_body(bucket, prefix):
+    return {
+        "status": "NO_FRAMES",
+        "bucket": bucket,
+        "prefix": prefix,
+        "hint": "Check FRAMES_BUCKET/FRAMES_BUCKET_PREFIX or upload images under this prefix.",
+    }
 
+
+
+# Run the sequential counter-drop state machine over frame_keys:
+# - track counter drops + missing boxes
+# - render annotated output frames
+# - create events (DDB + SNS) via Events lambda
+# boxes_for(key) supplies the detection result for a frame, so the same
+# reduction runs whether detection happened inline or in a Map fan-out.
+def _process_frames(BUCKET, frame_keys, prefix, drowningset_prefix, boxes_for):
     outputs = []
     alerts = []
+    deferred_presigns = []  # outputs indexes awaiting a post-loop presign
+    event_payloads = []  # alert records for one batched Events invoke
 
     prev_key = None
-    prev_boxes = None
+    prev_xyxy = None
     prev_count = None
     prev_drowningset_key = None
 
     baseline_count = None
-    active_missing_boxes = []
+    active_missing_xyxy = _EMPTY_XYXY
     active_from_prev_key = None
 
     for key in frame_keys:
-        curr_boxes = detect_person_boxes(BUCKET, key)
-        curr_count = len(curr_boxes)
+        # Canonical per-frame form: (N, 4) float32 xyxy + (N,) confidences.
+        # Dicts are generated only at the JSON boundaries below.
+        curr_xyxy, curr_confs = boxes_for(key)
+        curr_count = len(curr_xyxy)
         drop_by = 0
 
         if prev_count is not None and curr_count < prev_count:
@@ -489,14 +768,21 @@ def lambda_handler(event, context):
             if baseline_count is None:
                 baseline_count = prev_count
 
-            missing_candidates = find_missing_boxes(prev_boxes, curr_boxes)
+            if drop_by == 1:
+                # Single-drop fast path: the matcher's unmatched set plus an
+                # argmax tie-break, skipping pick_top_missing's sort.
+                active_missing_xyxy = _worst_matched_prev(prev_xyxy, curr_xyxy)
+            else:
+                missing_candidates = find_missing_boxes(prev_xyxy, curr_xyxy)
 
-            if drop_by > 0 and (not missing_candidates):
-                missing_candidates = prev_boxes[:] if prev_boxes else []
+                if drop_by > 0 and len(missing_candidates) == 0:
+                    missing_candidates = (
+                        prev_xyxy.copy() if prev_xyxy is not None else _EMPTY_XYXY
+                    )
 
-            active_missing_boxes = pick_top_missing(
-                prev_boxes, curr_boxes, missing_candidates, drop_by
-            )
+                active_missing_xyxy = pick_top_missing(
+                    curr_xyxy, missing_candidates, drop_by
+                )
             active_from_prev_key = prev_key
 
             alerts.append(
@@ -508,19 +794,19 @@ def lambda_handler(event, context):
                     "prev_count": prev_count,
                     "curr_count": curr_count,
                     "drop_by": drop_by,
-                    "missing_boxes_last_seen": active_missing_boxes,
+                    "missing_boxes_last_seen": _xyxy_to_box_dicts(active_missing_xyxy),
                 }
             )
 
         if baseline_count is not None and curr_count >= baseline_count:
             baseline_count = None
-            active_missing_boxes = []
+            active_missing_xyxy = _EMPTY_XYXY
             active_from_prev_key = None
 
         is_alert = (
             baseline_count is not None
             and curr_count < baseline_count
-            and len(active_missing_boxes) > 0
+            and len(active_missing_xyxy) > 0
         )
 
         status_label = "ALERT" if is_alert else "OK"
@@ -529,27 +815,85 @@ def lambda_handler(event, context):
             + (f" | baseline={baseline_count}" if baseline_count is not None else "")
         )
 
-        drowningset_key = f"{drowningset_prefix}{_basename(key)}_{status_label}.png"
-
-        # Call Render lambda (draw + S3 + presign).
-        render_payload = {
-            "bucket": BUCKET,
-            "src_key": key,
-            "out_key": drowningset_key,
-            "title": title,
-            "curr_boxes": curr_boxes,
-            "missing_boxes": (active_missing_boxes if is_alert else []),
-            "presign_expires": PRESIGN_EXPIRES,
-        }
-        render_res = invoke_render_lambda(render_payload)
-        drowningset_url = render_res.get("out_url")
-        render_ok = bool(render_res.get("ok"))
+        missing_box_dicts = _xyxy_to_box_dicts(active_missing_xyxy) if is_alert else []
+
+        if (not DRAW_TITLE_ON_OK) and (not is_alert) and curr_count == 0:
+            # Passthrough fast path: nothing to draw, so a metadata-only S3
+            # copy replaces the whole decode+draw+encode render round-trip.
+            # The copy keeps the source encoding, so keep its extension too.
+            src_ext = key.rsplit(".", 1)[-1].lower()
+            drowningset_key = (
+                f"{drowningset_prefix}{_basename(key)}_{status_label}.{src_ext}"
+            )
+            try:
+                _copy_object(
+                    Bucket=BUCKET,
+                    Key=drowningset_key,
+                    CopySource={"Bucket": BUCKET, "Key": key},
+                )
+                render_ok = True
+            except ClientError as e:
+                print(f"[ERROR] passthrough copy failed for {key}: {str(e)}")
+                render_ok = False
+            # Presigning is pure local sigv4 math but still ~1-2ms per call;
+            # OK-frame URLs are only read from the JSON response, so batch
+            # them in one pass after the loop instead of paying per frame.
+            drowningset_url = None
+            if render_ok:
+                deferred_presigns.append(len(outputs))
+        else:
+            drowningset_key = (
+                f"{drowningset_prefix}{_basename(key)}_{status_label}.{_OUT_EXT}"
+            )
+
+            # Call Render lambda (draw + S3 + presign).
+            render_payload = {
+                "bucket": BUCKET,
+                "src_key": key,
+                "out_key": drowningset_key,
+                "title": title,
+                "curr_boxes": _xyxy_to_box_dicts(curr_xyxy, curr_confs),
+                "missing_boxes": missing_box_dicts,
+                "presign_expires": PRESIGN_EXPIRES,
+            }
+            # Fire-and-forget: the Event invoke returns as soon as the
+            # render is queued, and the output URL is presigned locally.
+            invoke_render_lambda(render_payload)
+
+            if is_alert:
+                # Alert path: the Events lambda must not reference an image
+                # that is not uploaded yet, so poll for the rendered object.
+                render_ok = _wait_for_object(BUCKET, drowningset_key)
+                if not render_ok:
+                    # The async render missed the wait window (cold start,
+                    # queueing). Render synchronously rather than dropping
+                    # the alert; the duplicate write to the same key is
+                    # harmless.
+                    print(f"[WARN] async render slow for {key}, retrying synchronously")
+                    render_ok = bool(
+                        invoke_render_lambda_sync(render_payload).get("ok")
+                    )
+                drowningset_url = (
+                    presign_get_url(BUCKET, drowningset_key) if render_ok else None
+                )
+            else:
+                # OK path: never wait; batch the presign after the loop.
+                render_ok = True
+                drowningset_url = None
+                deferred_presigns.append(len(outputs))
 
         created_event_id = None
 
         if is_alert and render_ok:
-            created_event_id = f"EVT-{int(time.time())}-{_basename(key)}"
-            created_at_iso = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            # One clock read feeds both the id and the timestamp, so the two
+            # can never straddle a second boundary and disagree.
+            now = time.time()
+            created_event_id = f"EVT-{int(now)}-{_basename(key)}"
+            created_at_iso = (
+                datetime.fromtimestamp(now, timezone.utc)
+                .isoformat()
+                .replace("+00:00", "Z")
+            )
 
             prev_url_for_sns = (
                 presign_get_url(BUCKET, prev_drowningset_key)
@@ -557,19 +901,20 @@ def lambda_handler(event, context):
                 else None
             )
 
-            # Invoke Events lambda (DDB + SNS).
-            events_payload = {
-                "eventId": created_event_id,
-                "created_at": created_at_iso,
-                "status": "OPEN",
-                "events_table": EVENTS_TABLE_NAME,  # optional
-                "bucket": BUCKET,
-                "warningImageKey": drowningset_key,
-                "warningImageUrl": drowningset_url,
-                "prevImageKey": prev_drowningset_key,
-                "prevImageUrl": prev_url_for_sns,
-            }
-            invoke_events_lambda(events_payload)
+            # Collect for one batched Events invoke (DDB + SNS) after the
+            # loop instead of one Lambda invoke per alert.
+            event_payloads.append(
+                {
+                    "eventId": created_event_id,
+                    "created_at": created_at_iso,
+                    "status": "OPEN",
+                    "bucket": BUCKET,
+                    "warningImageKey": drowningset_key,
+                    "warningImageUrl": drowningset_url,
+                    "prevImageKey": prev_drowningset_key,
+                    "prevImageUrl": prev_url_for_sns,
+                }
+            )
 
         outputs.append(
             {
@@ -582,30 +927,176 @@ def lambda_handler(event, context):
                 "drowningset_url": drowningset_url,
                 "render_ok": render_ok,
                 "eventId": created_event_id,
-                "missing_boxes_last_seen": (active_missing_boxes if is_alert else []),
+                "missing_boxes_last_seen": missing_box_dicts,
                 "missing_from_prev_frame": active_from_prev_key,
                 "prev_drowningset_key": prev_drowningset_key,
             }
         )
 
         prev_key = key
-        prev_boxes = curr_boxes
+        prev_xyxy = curr_xyxy
         prev_count = curr_count
         prev_drowningset_key = drowningset_key
 
-    return _resp(
-        200,
-        {
-            "status": "DROWNINGSET_AND_EVENTS_CREATED",
-            "bucket": BUCKET,
-            "frames_prefix": prefix,
-            "drowningset_prefix": drowningset_prefix,
-            "render_lambda": RENDER_LAMBDA_NAME,
-            "events_lambda": EVENTS_LAMBDA_NAME,
-            "total_frames": len(frame_keys),
-            "outputs_count": len(outputs),
-            "outputs": outputs,
-            "alerts_count": len(alerts),
-            "alerts": alerts,
-        },
+    # Single pass for the passthrough + OK frames deferred above: presign
+    # only when asked to, plain s3:// URI otherwise.
+    for idx in deferred_presigns:
+        out = outputs[idx]
+        if PRESIGN_OUTPUTS:
+            out["drowningset_url"] = presign_get_url(BUCKET, out["drowningset_key"])
+        else:
+            out["drowningset_url"] = f"s3://{BUCKET}/{out['drowningset_key']}"
+
+    # One Events invoke covers every alert from this run; the Events lambda
+    # batch-writes the items and batch-publishes the SNS messages.
+    if event_payloads:
+        invoke_events_lambda(
+            {"events": event_payloads, "events_table": EVENTS_TABLE_NAME}
+        )
+
+    return {
+        "status": "DROWNINGSET_AND_EVENTS_CREATED",
+        "bucket": BUCKET,
+        "frames_prefix": prefix,
+        "drowningset_prefix": drowningset_prefix,
+        "render_lambda": RENDER_LAMBDA_NAME,
+        "events_lambda": EVENTS_LAMBDA_NAME,
+        "total_frames": len(frame_keys),
+        "outputs_count": len(outputs),
+        "outputs": outputs,
+        "alerts_count": len(alerts),
+        "alerts": alerts,
+    }
+
+
+
+# Orchestrate frame processing inline (single Lambda):
+# - list frames
+# - detect people per frame
+# - run the sequential reduction over the results
+def lambda_handler(event, context):
+    event = _normalize_event(event)
+    BUCKET, prefix, drowningset_prefix, max_frames = _resolve_inputs(event)
+
+    frame_pairs = list_frames_numeric(BUCKET, prefix, max_frames)
+    if not frame_pairs:
+        return _resp(200, _no_frames_body(BUCKET, prefix))
+    frame_keys = [k for k, _ in frame_pairs]
+
+    # Prefetch detections for all frames concurrently; the reduction loop
+    # stays strictly sequential and just awaits each frame's future in order.
+    futures = {
+        k: _DETECT_POOL.submit(detect_person_boxes_cached, BUCKET, k, e)
+        for k, e in frame_pairs
+    }
+    try:
+        body = _process_frames(
+            BUCKET,
+            frame_keys,
+            prefix,
+            drowningset_prefix,
+            boxes_for=lambda key: futures[key].result(),
+        )
+    finally:
+        # Don't leave orphaned Rekognition calls running into the next
+        # invocation if the reduction bails early.
+        for fut in futures.values():
+            fut.cancel()
+
+    return _resp(200, body)
+
+
+# =============================================================================
+# Step Functions entry points (Map-state fan-out)
+# =============================================================================
+# The state machine in deploy/statemachine.json runs:
+#   list_handler -> Map(detect_handler per frame) -> reduce_handler
+# Detection (the I/O-heavy part) fans out to parallel Lambdas, while the
+# order-dependent counter-drop reduction stays sequential in reduce_handler.
+
+
+# S3 key of the per-frame intermediate JSON written by detect_handler.
+def _intermediate_key(intermediates_prefix, key):
+    return f"{intermediates_prefix}{_basename(key)}.json"
+
+
+
+# List frames and emit one Map item per frame.
+def list_handler(event, context):
+    event = _normalize_event(event)
+    BUCKET, prefix, drowningset_prefix, max_frames = _resolve_inputs(event)
+    intermediates_prefix = event.get("intermediates_prefix", INTERMEDIATES_PREFIX)
+
+    frame_pairs = list_frames_numeric(BUCKET, prefix, max_frames)
+
+    return {
+        "bucket": BUCKET,
+        "prefix": prefix,
+        "drowningset_prefix": drowningset_prefix,
+        "max_frames": max_frames,
+        "intermediates_prefix": intermediates_prefix,
+        "frames": [
+            {
+                "bucket": BUCKET,
+                "key": k,
+                "etag": e,
+                "intermediates_prefix": intermediates_prefix,
+            }
+            for k, e in frame_pairs
+        ],
+    }
+
+
+
+# Detect people in ONE frame and persist the result as an intermediate.
+def detect_handler(event, context):
+    event = _normalize_event(event)
+    bucket = event.get("bucket")
+    key = event.get("key")
+    intermediates_prefix = event.get("intermediates_prefix", INTERMEDIATES_PREFIX)
+
+    if not bucket or not key:
+        return {"ok": False, "error": "bucket/key required"}
+
+    xyxy, confs = detect_person_boxes_cached(bucket, key, event.get("etag"))
+    box_dicts = _xyxy_to_box_dicts(xyxy, confs)
+    out_key = _intermediate_key(intermediates_prefix, key)
+    s3.put_object(
+        Bucket=bucket,
+        Key=out_key,
+        Body=json.dumps({"key": key, "boxes": box_dicts, "count": len(box_dicts)}).encode("utf-8"),
+        ContentType="application/json",
     )
+
+    return {"ok": True, "key": key, "count": len(box_dicts), "intermediate_key": out_key}
+
+
+
+# Read the intermediates and run the sequential reduction.
+def reduce_handler(event, context):
+    event = _normalize_event(event)
+    BUCKET, prefix, drowningset_prefix, max_frames = _resolve_inputs(event)
+    intermediates_prefix = event.get("intermediates_prefix", INTERMEDIATES_PREFIX)
+
+    frame_pairs = list_frames_numeric(BUCKET, prefix, max_frames)
+    if not frame_pairs:
+        return _resp(200, _no_frames_body(BUCKET, prefix))
+    frame_keys = [k for k, _ in frame_pairs]
+    etags = dict(frame_pairs)
+
+    def boxes_for(key):
+        try:
+            raw = s3.get_object(
+                Bucket=BUCKET, Key=_intermediate_key(intermediates_prefix, key)
+            )["Body"].read()
+            box_dicts = json.loads(raw).get("boxes", [])
+            return (
+                _boxes_to_xyxy(box_dicts),
+                np.asarray([b.get("Conf", 0) for b in box_dicts], dtype=np.float32),
+            )
+        except Exception:
+            # Intermediate missing (partial Map run) -> detect inline.
+            return detect_person_boxes_cached(BUCKET, key, etags.get(key))
+
+    body = _process_frames(BUCKET, frame_keys, prefix, drowningset_prefix, boxes_for)
+    return _resp(200, body)
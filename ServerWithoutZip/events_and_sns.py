@@ -16,6 +16,9 @@ import os
 dynamodb = boto3.resource("dynamodb")
 sns = boto3.client("sns")
 
+# SNS publish_batch accepts at most 10 entries per call.
+_SNS_BATCH_MAX = 10
+
 
 # =============================================================================
 # SNS helpers
@@ -30,14 +33,108 @@ def publish_sns(topic_arn, subject, message):
     sns.publish(TopicArn=topic_arn, Subject=subject, Message=message)
 
 
+# Publish one round of publish_batch calls and return the (subject,
+# message) pairs SNS reported back in "Failed" — publish_batch does NOT
+# raise for per-entry failures.
+def _publish_batch_round(topic_arn, entries):
+    failed = []
+    for start in range(0, len(entries), _SNS_BATCH_MAX):
+        chunk = entries[start : start + _SNS_BATCH_MAX]
+        resp = sns.publish_batch(
+            TopicArn=topic_arn,
+            PublishBatchRequestEntries=[
+                {"Id": str(i), "Subject": subj, "Message": msg}
+                for i, (subj, msg) in enumerate(chunk)
+            ],
+        )
+        for f in resp.get("Failed", []):
+            print(
+                f"[WARN] SNS publish failed: {f.get('Code')} {f.get('Message')}"
+            )
+            try:
+                failed.append(chunk[int(f["Id"])])
+            except (KeyError, ValueError, IndexError):
+                pass
+    return failed
+
+
+# Publish several (subject, message) pairs with as few API calls as
+# possible: one publish_batch round trip per 10 alerts. Entries SNS
+# rejects get one retry; anything still failing raises so the handler
+# reports ok=False instead of silently dropping an alert.
+def publish_sns_batch(topic_arn, entries):
+    if not topic_arn:
+        print("[SNS] sns_topic_arn empty -> skip")
+        return
+    failed = _publish_batch_round(topic_arn, entries)
+    if failed:
+        failed = _publish_batch_round(topic_arn, failed)
+    if failed:
+        raise RuntimeError(f"SNS publish failed for {len(failed)} alert(s)")
+
+
+# =============================================================================
+# Event record helpers
+# =============================================================================
+
+
+# Build the DynamoDB item and SNS (subject, message) pair for one alert
+# payload. Raises ValueError on missing required fields.
+def _build_event(event):
+    event_id = event.get("eventId")
+    created_at = event.get("created_at")
+    status = event.get("status", "OPEN")
+
+    prev_key = event.get("prevImageKey")
+    warn_key = event.get("warningImageKey")
+    prev_url = event.get("prevImageUrl")
+    warn_url = event.get("warningImageUrl")
+
+    if not event_id or not created_at or not warn_key:
+        raise ValueError("eventId/created_at/warningImageKey required")
+
+    item = {
+        "eventId": event_id,
+        "status": status,
+        "created_at": created_at,
+        "warningImageKey": warn_key,
+        "warningImageUrl": warn_url,
+    }
+    if prev_key:
+        item["prevImageKey"] = prev_key
+    if prev_url:
+        item["prevImageUrl"] = prev_url
+
+    subject = f"LifeShot ALERT: {event_id}"
+    # Single f-string: one allocation instead of a list + join pass.
+    msg = (
+        "🚨 POSSIBLE DROWNING DETECTED\n"
+        "\n"
+        f"EventId: {event_id}\n"
+        f"CreatedAt: {created_at}\n"
+        "\n"
+        "BEFORE (prev):\n"
+        f"PrevImageKey: {prev_key or 'N/A'}\n"
+        f"PrevImageUrl: {prev_url or 'N/A'}\n"
+        "\n"
+        "AFTER (alert):\n"
+        f"WarningImageKey: {warn_key or 'N/A'}\n"
+        f"WarningImageUrl: {warn_url or 'N/A'}\n"
+        "\n"
+        "Open your dashboard to view full details."
+    )
+
+    return item, (subject, msg)
+
+
 # =============================================================================
 # Lambda handler
 # =============================================================================
 
 
-# Persist an event record to DynamoDB and publish an alert via SNS.
+# Persist event records to DynamoDB and publish alerts via SNS.
 def lambda_handler(event, context):
-    # expected payload:
+    # expected payload (single alert):
     # {
     #   "eventId": "...",
     #   "created_at": "...Z",
@@ -50,65 +147,49 @@ def lambda_handler(event, context):
     #   "prevImageKey": "...",
     #   "prevImageUrl": "..."
     # }
+    # or a batch from one detector run:
+    # { "events": [ {alert payload}, ... ], "events_table": "...", "sns_topic_arn": "..." }
 
     try:
-        event_id = event.get("eventId")
-        created_at = event.get("created_at")
-        status = event.get("status", "OPEN")
+        batch = event.get("events") if isinstance(event, dict) else None
+        alerts = batch if batch is not None else [event]
 
         table_name = event.get("events_table") or os.getenv(
             "EVENTS_TABLE_NAME", "LifeShot_Events"
         )
         topic_arn = event.get("sns_topic_arn") or os.getenv("SNS_TOPIC_ARN", "")
 
-        prev_key = event.get("prevImageKey")
-        warn_key = event.get("warningImageKey")
-        prev_url = event.get("prevImageUrl")
-        warn_url = event.get("warningImageUrl")
+        items = []
+        messages = []
+        for alert in alerts:
+            try:
+                item, message = _build_event(alert)
+            except ValueError as e:
+                return {"ok": False, "error": str(e)}
+            items.append(item)
+            messages.append(message)
 
-        if not event_id or not created_at or not warn_key:
-            return {"ok": False, "error": "eventId/created_at/warningImageKey required"}
+        if not items:
+            return {"ok": False, "error": "no events in payload"}
 
         table = dynamodb.Table(table_name)
 
-        item = {
-            "eventId": event_id,
-            "status": status,
-            "created_at": created_at,
-            "warningImageKey": warn_key,
-            "warningImageUrl": warn_url,
-        }
-        if prev_key:
-            item["prevImageKey"] = prev_key
-        if prev_url:
-            item["prevImageUrl"] = prev_url
-
-        table.put_item(Item=item)
-        print(f"[DB] Event created: {event_id}")
-
-        subject = f"LifeShot ALERT: {event_id}"
-        lines = [
-            "🚨 POSSIBLE DROWNING DETECTED",
-            "",
-            f"EventId: {event_id}",
-            f"CreatedAt: {created_at}",
-            "",
-            "BEFORE (prev):",
-            f"PrevImageKey: {prev_key or 'N/A'}",
-            f"PrevImageUrl: {prev_url or 'N/A'}",
-            "",
-            "AFTER (alert):",
-            f"WarningImageKey: {warn_key or 'N/A'}",
-            f"WarningImageUrl: {warn_url or 'N/A'}",
-            "",
-            "Open your dashboard to view full details.",
-        ]
-        msg = "\n".join(lines)
-
-        publish_sns(topic_arn, subject, msg)
-        print(f"[SNS] Published alert for {event_id}")
-
-        return {"ok": True}
+        if len(items) == 1:
+            table.put_item(Item=items[0])
+        else:
+            # One buffered batch write instead of N sequential round trips.
+            with table.batch_writer() as bw:
+                for item in items:
+                    bw.put_item(Item=item)
+        print(f"[DB] Events created: {len(items)}")
+
+        if len(messages) == 1:
+            publish_sns(topic_arn, *messages[0])
+        else:
+            publish_sns_batch(topic_arn, messages)
+        print(f"[SNS] Published {len(messages)} alert(s)")
+
+        return {"ok": True, "count": len(items)}
 
     except Exception as e:
         return {"ok": False, "error": str(e)}
@@ -5,13 +5,23 @@ Cosmetic refactor only:
 - Does not change functionality or behavior.
 """
 
+import base64
 import json
 import boto3
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from decimal import Decimal
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
+# Optional: Rust JSON encoder; noticeably faster than the stdlib when
+# serializing a full events listing. Falls back to json transparently.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # =============================================================================
 # AWS clients
@@ -32,6 +42,9 @@ FRAMES_BUCKET_ENV = os.getenv(
 
 PRESIGN_EXPIRES = int(os.getenv("PRESIGN_EXPIRES", "900"))
 
+# GSI used by the paginated GET path (status hash / created_at range).
+EVENTS_STATUS_INDEX = os.getenv("EVENTS_STATUS_INDEX", "status-created_at-index")
+
 
 # =============================================================================
 # JSON encoding helpers
@@ -46,6 +59,13 @@ class DecimalEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+# orjson equivalent of DecimalEncoder for types it doesn't handle natively.
+def _orjson_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return str(obj)
+
+
 # =============================================================================
 # HTTP helpers
 # =============================================================================
@@ -63,10 +83,14 @@ def _cors_headers():
 
 # Build an API Gateway response payload.
 def _response(code, body_obj):
+    if orjson is not None:
+        body = orjson.dumps(body_obj, default=_orjson_default).decode()
+    else:
+        body = json.dumps(body_obj, cls=DecimalEncoder)
     return {
         "statusCode": code,
         "headers": _cors_headers(),
-        "body": json.dumps(body_obj, cls=DecimalEncoder),
+        "body": body,
     }
 
 
@@ -84,6 +108,40 @@ def _presign_get(bucket, key):
         return None
 
 
+# Presigning is a local SigV4 signing pass (~50us plus credential lookup)
+# done twice per event; fan the per-item work across a small shared pool
+# so a 50-item page signs in a few bursts instead of a serial loop.
+_PRESIGN_POOL = ThreadPoolExecutor(max_workers=8)
+
+
+# Resolve the bucket and attach presigned prev/warning URLs for one item.
+def _attach_urls(item):
+    bucket = _resolve_bucket_for_event(item)
+    item["bucketResolved"] = bucket
+    item["prevImageUrl"] = _presign_get(bucket, item.get("prevImageKey"))
+    item["warningImageUrl"] = _presign_get(bucket, item.get("warningImageKey"))
+    return item
+
+
+# Opaque pagination token <-> DynamoDB LastEvaluatedKey.
+def _encode_next_token(last_key):
+    if not last_key:
+        return None
+    return base64.urlsafe_b64encode(
+        json.dumps(last_key, cls=DecimalEncoder).encode()
+    ).decode()
+
+
+def _decode_next_token(token):
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return key if isinstance(key, dict) else None
+    except Exception:
+        return None
+
+
 # Current time in UTC, formatted as ISO 8601 with trailing 'Z'.
 def _iso_utc_now():
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
@@ -170,13 +228,30 @@ def lambda_handler(event, context):
             if not event_id:
                 return _response(400, {"error": "eventId is required"})
 
-            get_resp = table.get_item(Key={"eventId": event_id})
-            item = get_resp.get("Item")
-            if not item:
-                return _response(404, {"error": "Event not found"})
+            closed_at = _iso_utc_now()
 
-            # Already closed? keep idempotent behavior
-            if str(item.get("status", "")).upper() == "CLOSED":
+            # Single conditional write instead of get_item + put-style
+            # update: the status transition is claimed atomically (no
+            # read-modify-write race between two lifeguards closing the
+            # same event), and ALL_OLD hands back created_at for the
+            # response-time math without a separate read.
+            try:
+                upd = table.update_item(
+                    Key={"eventId": event_id},
+                    UpdateExpression="SET #s = :s, closedAt = :c",
+                    ConditionExpression="attribute_exists(eventId) AND #s <> :s",
+                    ExpressionAttributeNames={"#s": "status"},
+                    ExpressionAttributeValues={":s": "CLOSED", ":c": closed_at},
+                    ReturnValues="ALL_OLD",
+                )
+            except ClientError as e:
+                code = e.response.get("Error", {}).get("Code", "")
+                if code != "ConditionalCheckFailedException":
+                    raise
+                # Missing event or already closed: one read to tell apart.
+                item = table.get_item(Key={"eventId": event_id}).get("Item")
+                if not item:
+                    return _response(404, {"error": "Event not found"})
                 return _response(
                     200,
                     {
@@ -187,8 +262,7 @@ def lambda_handler(event, context):
                     },
                 )
 
-            created_at = item.get("created_at")
-            closed_at = _iso_utc_now()
+            created_at = upd.get("Attributes", {}).get("created_at")
 
             response_seconds = -1
             try:
@@ -201,13 +275,8 @@ def lambda_handler(event, context):
 
             table.update_item(
                 Key={"eventId": event_id},
-                UpdateExpression="SET #s = :s, closedAt = :c, responseSeconds = :r",
-                ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={
-                    ":s": "CLOSED",
-                    ":c": closed_at,
-                    ":r": response_seconds,
-                },
+                UpdateExpression="SET responseSeconds = :r",
+                ExpressionAttributeValues={":r": response_seconds},
             )
 
             return _response(
@@ -228,6 +297,70 @@ def lambda_handler(event, context):
     # ==========================
     if method == "GET":
         try:
+            qs = event.get("queryStringParameters") or {}
+            limit = qs.get("limit")
+
+            if limit:
+                # Paginated path: one indexed Query page (newest first) for
+                # the requested status, instead of scanning the whole table.
+                # Falls back to the scan path only when the GSI itself is
+                # missing (old deployment / still backfilling).
+                try:
+                    limit_n = int(limit)
+                except (TypeError, ValueError):
+                    return _response(400, {"error": "limit must be an integer"})
+
+                status = (qs.get("status") or "OPEN").upper()
+                kwargs = {
+                    "IndexName": EVENTS_STATUS_INDEX,
+                    "KeyConditionExpression": Key("status").eq(status),
+                    "ScanIndexForward": False,
+                    "Limit": max(1, min(limit_n, 200)),
+                }
+                token = qs.get("nextToken")
+                start_key = _decode_next_token(token)
+                if token and start_key is None:
+                    return _response(400, {"error": "invalid nextToken"})
+                if start_key:
+                    kwargs["ExclusiveStartKey"] = start_key
+
+                try:
+                    resp = table.query(**kwargs)
+                except ClientError as e:
+                    err = e.response.get("Error", {})
+                    code = err.get("Code", "")
+                    msg = err.get("Message", "") or str(e)
+                    if code == "ResourceNotFoundException" or (
+                        code == "ValidationException" and "index" in msg.lower()
+                    ):
+                        # Only an absent index justifies the scan fallback
+                        # (old deployment / still backfilling).
+                        print(f"[WARN] GSI missing, falling back to scan: {msg}")
+                        resp = None
+                    elif code == "ValidationException":
+                        # Stale or mismatched ExclusiveStartKey: the
+                        # caller's token, not a server fault.
+                        return _response(400, {"error": "invalid nextToken"})
+                    else:
+                        # Throttling, AccessDenied, etc. are server-side —
+                        # let the outer handler report a 500.
+                        raise
+
+                if resp is not None:
+                    items = resp.get("Items", [])
+                    list(_PRESIGN_POOL.map(_attach_urls, items))
+                    return _response(
+                        200,
+                        {
+                            "events": items,
+                            "nextToken": _encode_next_token(
+                                resp.get("LastEvaluatedKey")
+                            ),
+                        },
+                    )
+
+            # Legacy path (no limit param): full listing as a plain array,
+            # which the dashboard clients consume directly.
             resp = table.scan()
             items = resp.get("Items", [])
 
@@ -235,15 +368,7 @@ def lambda_handler(event, context):
                 resp = table.scan(ExclusiveStartKey=resp["LastEvaluatedKey"])
                 items.extend(resp.get("Items", []))
 
-            for it in items:
-                bucket = _resolve_bucket_for_event(it)
-
-                prev_key = it.get("prevImageKey")
-                warn_key = it.get("warningImageKey")
-
-                it["bucketResolved"] = bucket
-                it["prevImageUrl"] = _presign_get(bucket, prev_key)
-                it["warningImageUrl"] = _presign_get(bucket, warn_key)
+            list(_PRESIGN_POOL.map(_attach_urls, items))
 
             return _response(200, items)
 
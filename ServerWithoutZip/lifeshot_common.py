@@ -0,0 +1,92 @@
+"""Shared helpers for the LifeShot Lambdas.
+
+One definition of the S3 client, image-key helpers, and JSON response
+builder, imported by the detector and render modules instead of each
+carrying its own copy. Ship this file inside every Lambda zip that
+imports it.
+"""
+
+import json
+import os
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Optional: Rust JSON encoder, 3-5x faster than the stdlib on large
+# response bodies and able to serialize ndarrays without a .tolist() pass.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# =============================================================================
+# AWS clients
+# =============================================================================
+# Shared client config: a pool wide enough for concurrent calls within one
+# warm container, adaptive retries, and TCP keepalive so pooled connections
+# survive between invocations.
+BOTO_CFG = Config(
+    max_pool_connections=32,
+    retries={"max_attempts": 3, "mode": "adaptive"},
+    tcp_keepalive=True,
+)
+
+# One explicit session shared by every client: credentials are resolved
+# once per container instead of once per implicit default-session client.
+SESSION = boto3.Session()
+
+s3 = SESSION.client("s3", config=BOTO_CFG)
+
+
+# =============================================================================
+# Image key helpers
+# =============================================================================
+IMG_EXTS = (".png", ".jpg", ".jpeg")
+
+
+# Return True if the S3 key looks like a supported image file.
+def is_image_key(key: str) -> bool:
+    return key.lower().endswith(IMG_EXTS)
+
+
+# Return the filename (no folders) without image extension.
+# os.path.splitext is one C-level split on the last dot, vs case-folding
+# the whole name and probing each extension in turn.
+def basename(key: str) -> str:
+    name = key.rsplit("/", 1)[-1]
+    base, ext = os.path.splitext(name)
+    return base if ext.lower() in IMG_EXTS else name
+
+
+# =============================================================================
+# HTTP / S3 helpers
+# =============================================================================
+
+
+# Build an API Gateway / Function URL style JSON response.
+def resp(code, body_obj):
+    if orjson is not None:
+        body = orjson.dumps(body_obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    else:
+        body = json.dumps(body_obj)
+    return {
+        "statusCode": code,
+        "headers": {"Content-Type": "application/json"},
+        "body": body,
+    }
+
+
+# Create a pre-signed S3 GET URL for an object key (or None on failure).
+def presign_get_url(bucket, key, expires):
+    if not key:
+        return None
+    try:
+        return s3.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=expires,
+        )
+    except ClientError:
+        return None
@@ -123,6 +123,8 @@ DATASET_TEST1 = os.getenv("DATASET_TEST1", "Test1")
 DATASET_TEST2 = os.getenv("DATASET_TEST2", "Test2")
 
 EVENTS_TABLE_NAME = os.getenv("EVENTS_TABLE_NAME", "LifeShot_Events")
+EVENTS_STATUS_INDEX_NAME = os.getenv("EVENTS_STATUS_INDEX_NAME", "status-created_at-index")
+DETECTION_CACHE_TABLE_NAME = os.getenv("DETECTION_CACHE_TABLE_NAME", "LifeShot_DetectionCache")
 
 
 # =============================================================================
@@ -749,8 +751,22 @@ def ensure_dynamodb_table(ddb, table_name: str) -> None:
     log(f"Creating DynamoDB table: {table_name}")
     ddb.create_table(
         TableName=table_name,
-        AttributeDefinitions=[{"AttributeName": "eventId", "AttributeType": "S"}],
+        AttributeDefinitions=[
+            {"AttributeName": "eventId", "AttributeType": "S"},
+            {"AttributeName": "status", "AttributeType": "S"},
+            {"AttributeName": "created_at", "AttributeType": "S"},
+        ],
         KeySchema=[{"AttributeName": "eventId", "KeyType": "HASH"}],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": EVENTS_STATUS_INDEX_NAME,
+                "KeySchema": [
+                    {"AttributeName": "status", "KeyType": "HASH"},
+                    {"AttributeName": "created_at", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+        ],
         BillingMode="PAY_PER_REQUEST",
     )
     waiter = ddb.get_waiter("table_exists")
@@ -758,6 +774,73 @@ def ensure_dynamodb_table(ddb, table_name: str) -> None:
     log(f"Created DynamoDB table: {table_name}")
 
 
+# Add the status/created_at GSI to a pre-existing events table (new tables
+# get it at creation). Lets GET /events serve paginated queries instead of
+# scanning the whole table.
+def ensure_events_status_index(ddb, table_name: str) -> None:
+    desc = ddb.describe_table(TableName=table_name)["Table"]
+    for gsi in desc.get("GlobalSecondaryIndexes") or []:
+        if gsi.get("IndexName") == EVENTS_STATUS_INDEX_NAME:
+            log(f"GSI exists on {table_name}: {EVENTS_STATUS_INDEX_NAME}")
+            return
+
+    log(f"Adding GSI {EVENTS_STATUS_INDEX_NAME} to {table_name} (backfill runs async)")
+    try:
+        ddb.update_table(
+            TableName=table_name,
+            AttributeDefinitions=[
+                {"AttributeName": "status", "AttributeType": "S"},
+                {"AttributeName": "created_at", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexUpdates=[
+                {
+                    "Create": {
+                        "IndexName": EVENTS_STATUS_INDEX_NAME,
+                        "KeySchema": [
+                            {"AttributeName": "status", "KeyType": "HASH"},
+                            {"AttributeName": "created_at", "KeyType": "RANGE"},
+                        ],
+                        "Projection": {"ProjectionType": "ALL"},
+                    }
+                }
+            ],
+        )
+    except ClientError as e:
+        log(f"Could not add GSI to {table_name}: {e}")
+
+
+def ensure_detection_cache_table(ddb, table_name: str) -> None:
+    try:
+        ddb.describe_table(TableName=table_name)
+        log(f"DynamoDB table exists: {table_name}")
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code", "")
+        if code != "ResourceNotFoundException":
+            raise
+        log(f"Creating DynamoDB table: {table_name}")
+        ddb.create_table(
+            TableName=table_name,
+            AttributeDefinitions=[{"AttributeName": "etag", "AttributeType": "S"}],
+            KeySchema=[{"AttributeName": "etag", "KeyType": "HASH"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        waiter = ddb.get_waiter("table_exists")
+        waiter.wait(TableName=table_name)
+        log(f"Created DynamoDB table: {table_name}")
+
+    # Expire cached detections automatically via the 'ttl' attribute.
+    try:
+        ddb.update_time_to_live(
+            TableName=table_name,
+            TimeToLiveSpecification={"Enabled": True, "AttributeName": "ttl"},
+        )
+        log(f"Enabled TTL (ttl) on table: {table_name}")
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code", "")
+        if code != "ValidationException":  # already enabled -> ValidationException
+            log(f"Could not enable TTL on {table_name}: {e}")
+
+
 # -------------------------
 # IAM policy for S3 + Dynamo (regular accounts only)
 # -------------------------
@@ -768,9 +851,11 @@ def ensure_role_data_access_policy(
     account_id: str,
     bucket: str,
     table_name: str,
+    cache_table_name: str = DETECTION_CACHE_TABLE_NAME,
 ) -> None:
     policy_name = "LifeShotDataAccess"
     table_arn = f"arn:aws:dynamodb:{region}:{account_id}:table/{table_name}"
+    cache_table_arn = f"arn:aws:dynamodb:{region}:{account_id}:table/{cache_table_name}"
     bucket_arn = f"arn:aws:s3:::{bucket}"
     bucket_objects_arn = f"arn:aws:s3:::{bucket}/*"
 
@@ -795,7 +880,9 @@ def ensure_role_data_access_policy(
                     "dynamodb:Scan",
                     "dynamodb:DescribeTable",
                 ],
-                "Resource": [table_arn],
+                # GSI queries authorize against the index ARN, not the
+                # table ARN — without it the paginated GET path is denied.
+                "Resource": [table_arn, f"{table_arn}/index/*", cache_table_arn],
             },
         ],
     }
@@ -1199,6 +1286,39 @@ def make_placeholder_zip(module_name: str, out_zip: str) -> None:
         zip_from_dir(td, out_zip)
 
 
+# Return the path to a Lambda-layer zip carrying numpy + scipy under
+# python/. Prefers a prebuilt deploy/numpy_scipy311.zip (same convention as
+# pillow311.zip); otherwise builds one here with pip, pulling manylinux
+# wheels that match the Lambda runtime rather than this machine.
+def ensure_numpy_scipy_layer_zip(here: str) -> str:
+    prebuilt = os.path.join(here, "numpy_scipy311.zip")
+    if os.path.exists(prebuilt):
+        log(f"Using prebuilt NumPy/SciPy layer zip: {prebuilt}")
+        return prebuilt
+
+    log("Building NumPy/SciPy layer zip with pip (manylinux wheels)...")
+    build_dir = tempfile.mkdtemp(prefix="lifeshot_numsci_")
+    target = os.path.join(build_dir, "python")
+    res = subprocess.run([
+        sys.executable, "-m", "pip", "install", "--quiet",
+        "--platform", "manylinux2014_x86_64",
+        "--implementation", "cp",
+        "--python-version", DEFAULT_PY_RUNTIME.replace("python", ""),
+        "--only-binary", ":all:",
+        "--target", target,
+        "numpy", "scipy",
+    ])
+    if res.returncode != 0:
+        die("pip could not build the NumPy/SciPy layer; "
+            "build it manually and save it as deploy/numpy_scipy311.zip")
+
+    # Zip the whole build dir so entries keep the python/ layer prefix
+    # (the zip itself lives outside the dir being walked).
+    out_zip = build_dir + ".zip"
+    zip_from_dir(build_dir, out_zip)
+    return out_zip
+
+
 def make_events_api_placeholder_zip(out_zip: str) -> None:
     with tempfile.TemporaryDirectory() as td:
         py_path = os.path.join(td, "lambda_function.py")
@@ -1770,6 +1890,10 @@ def main() -> None:
     # -------------------------
     log("Ensuring DynamoDB events table...")
     ensure_dynamodb_table(ddb, EVENTS_TABLE_NAME)
+    ensure_events_status_index(ddb, EVENTS_TABLE_NAME)
+
+    log("Ensuring DynamoDB detection cache table...")
+    ensure_detection_cache_table(ddb, DETECTION_CACHE_TABLE_NAME)
 
     # If regular account role, attach data access policy (S3 + Dynamo)
     if can_manage_iam:
@@ -1780,6 +1904,7 @@ def main() -> None:
             account_id=account_id,
             bucket=FRAMES_BUCKET,
             table_name=EVENTS_TABLE_NAME,
+            cache_table_name=DETECTION_CACHE_TABLE_NAME,
         )
 
     # -------------------------
@@ -1868,7 +1993,7 @@ def main() -> None:
     )
 
     # ============================================================
-    # Publish + Attach Pillow Layer (from deploy/pillow311.zip)
+    # Publish + Attach Pillow + NumPy/SciPy Layers
     # ============================================================
     log("Ensuring Pillow (PIL) Layer is published + attached to Detector + Render...")
 
@@ -1885,7 +2010,28 @@ def main() -> None:
     pillow_layer_version_arn = layer_resp["LayerVersionArn"]
     log(f"Published Pillow layer version: {pillow_layer_version_arn}")
 
-    def _attach_layer(fn_name: str):
+    # detector_logic and render_and_s3 import numpy unconditionally (and the
+    # detector's Hungarian matcher wants scipy), so both must come from a
+    # layer just like Pillow. The zip is too big for a direct upload, so it
+    # goes through the frames bucket.
+    log("Ensuring NumPy/SciPy Layer is published + attached to Detector + Render...")
+
+    numsci_zip_path = ensure_numpy_scipy_layer_zip(here)
+    numsci_s3_key = f"{FRAMES_PREFIX}Deploy/numpy_scipy311.zip"
+    s3.upload_file(numsci_zip_path, FRAMES_BUCKET, numsci_s3_key)
+
+    numsci_resp = retry_on_conflict(lambda: client_lambda.publish_layer_version(
+        LayerName="LifeShot-NumSci",
+        Content={"S3Bucket": FRAMES_BUCKET, "S3Key": numsci_s3_key},
+        CompatibleRuntimes=[DEFAULT_PY_RUNTIME],
+        Description=f"LifeShot NumPy+SciPy layer ({now_utc_iso()})",
+    ))
+    numsci_layer_version_arn = numsci_resp["LayerVersionArn"]
+    log(f"Published NumPy/SciPy layer version: {numsci_layer_version_arn}")
+
+    managed_layer_arns = [pillow_layer_version_arn, numsci_layer_version_arn]
+
+    def _attach_layers(fn_name: str):
         wait_lambda_active(client_lambda, fn_name)
         cfg = client_lambda.get_function_configuration(FunctionName=fn_name)
         existing = cfg.get("Layers", []) or []
@@ -1893,24 +2039,25 @@ def main() -> None:
         kept = []
         for x in existing:
             arn = (x.get("Arn") or x.get("LayerVersionArn") or "").strip()
-            # remove older versions of our layer
-            if ":layer:LifeShot-Pillow:" in arn:
+            # remove older versions of our layers
+            if ":layer:LifeShot-Pillow:" in arn or ":layer:LifeShot-NumSci:" in arn:
                 continue
             if arn:
                 kept.append(arn)
 
-        if pillow_layer_version_arn not in kept:
-            kept.append(pillow_layer_version_arn)
+        for arn in managed_layer_arns:
+            if arn not in kept:
+                kept.append(arn)
 
         retry_on_conflict(lambda: client_lambda.update_function_configuration(
             FunctionName=fn_name,
             Layers=kept,
         ))
         wait_lambda_active(client_lambda, fn_name)
-        log(f"Attached/Updated Pillow layer on {fn_name}: {pillow_layer_version_arn}")
+        log(f"Attached/Updated layers on {fn_name}: {', '.join(managed_layer_arns)}")
 
-    _attach_layer(DETECTOR_LAMBDA_NAME)
-    _attach_layer(RENDER_LAMBDA_NAME)
+    _attach_layers(DETECTOR_LAMBDA_NAME)
+    _attach_layers(RENDER_LAMBDA_NAME)
 
 
     # -------------------------
@@ -1939,6 +2086,7 @@ def main() -> None:
         "FRAMES_BUCKET": FRAMES_BUCKET,
         "FRAMES_PREFIX": FRAMES_PREFIX,
         "EVENTS_TABLE_NAME": EVENTS_TABLE_NAME,
+        "DETECTION_CACHE_TABLE": DETECTION_CACHE_TABLE_NAME,
     })
 
     merge_lambda_env_vars(client_lambda, RENDER_LAMBDA_NAME, {
@@ -2001,6 +2149,7 @@ def main() -> None:
 
     merge_lambda_env_vars(client_lambda, EVENTS_API_LAMBDA_NAME, {
         "EVENTS_TABLE_NAME": EVENTS_TABLE_NAME,
+        "EVENTS_STATUS_INDEX": EVENTS_STATUS_INDEX_NAME,
         "FRAMES_BUCKET": FRAMES_BUCKET,
         "FRAMES_PREFIX": FRAMES_PREFIX,
     })